@@ -2,12 +2,22 @@
 
 from __future__ import annotations
 
-from datetime import date
-
-from fastapi import FastAPI, HTTPException
+import asyncio
+from collections.abc import AsyncIterator
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager
+from dataclasses import dataclass
+from datetime import date, timedelta
+from functools import lru_cache
+import os
+
+from fastapi import Depends, FastAPI, HTTPException, Response
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import ORJSONResponse
 import numpy as np
+import orjson
 import pandas as pd
+import pyarrow as pa
 
 from app.config import settings
 from app.models.schemas import (
@@ -22,13 +32,60 @@ from app.models.schemas import (
 )
 from app.services.alpaca_data import AlpacaDataError, AlpacaDataService
 from app.services.metrics import compute_metrics
-from app.services.strategy import buy_and_hold, run_mean_reversion_zscore, run_sma_crossover
+from app.services.strategy import (
+    buy_and_hold,
+    equity_from_returns,
+    run_mean_reversion_zscore,
+    run_sma_crossover,
+)
 
 _HORIZON_MONTHS = {"1M": 1, "6M": 6, "1Y": 12, "5Y": 60, "10Y": 120}
+_HORIZON_OFFSETS = {horizon: pd.DateOffset(months=months) for horizon, months in _HORIZON_MONTHS.items()}
+# Bars of indicator history fetched ahead of the horizon window. Covers SMA(20) and the 26-week
+# portfolio momentum with room to spare, so windowed results match a full-history run.
+_WARMUP_BARS = 52
+_CALENDAR_DAYS_PER_BAR = {"weekly": 7, "daily": 2}
+# Extra history on trimmed fetches: the window is anchored on the last bar, which can trail
+# `end_date` by holidays, weekends or a partial week; a month absorbs that without a refetch.
+_HISTORY_SLACK = timedelta(days=31)
 _DEFAULT_ALLOWED_ORIGINS = ["http://localhost:8080", "http://127.0.0.1:8080"]
+_BENCHMARK_SYMBOLS = ("SPY", "QQQ", "DIA")
+_ARROW_STREAM_MEDIA_TYPE = "application/vnd.apache.arrow.stream"
+_ARROW_CURVE_SCHEMA = pa.schema(
+    [
+        ("series", pa.string()),
+        ("symbol", pa.string()),
+        ("date", pa.date32()),
+        ("equity", pa.float64()),
+    ]
+)
 
+# Alpaca requests are network-bound, so the per-symbol fetches of a request run side by side.
+_MAX_CONCURRENT_FETCHES = 8
+# Per-series strategy and metric work is independent; NumPy/pandas kernels release the GIL for most of it.
+_STRATEGY_POOL = ThreadPoolExecutor(max_workers=os.cpu_count() or 1, thread_name_prefix="strategy")
 
-app = FastAPI(title="SMA Backtesting API", version="0.1.0")
+
+@asynccontextmanager
+async def lifespan(_: FastAPI) -> AsyncIterator[None]:
+    # Build the shared data service before the first request arrives. Missing credentials are
+    # left to surface per request as a 502 from get_data_service.
+    try:
+        _shared_data_service()
+    except AlpacaDataError:
+        pass
+    yield
+    if _shared_data_service.cache_info().currsize:
+        await _shared_data_service().close()
+        _shared_data_service.cache_clear()
+
+
+app = FastAPI(
+    title="SMA Backtesting API",
+    version="0.1.0",
+    lifespan=lifespan,
+    default_response_class=ORJSONResponse,
+)
 
 
 def _parse_allowed_origins(raw_origins: str) -> list[str]:
@@ -54,11 +111,35 @@ app.add_middleware(
 )
 
 
+@lru_cache(maxsize=1)
+def _shared_data_service() -> AlpacaDataService:
+    return AlpacaDataService()
+
+
+async def get_data_service() -> AlpacaDataService:
+    """Return the process-wide data service; it is stateless apart from the pooled HTTP client."""
+    try:
+        return _shared_data_service()
+    except AlpacaDataError as exc:
+        raise HTTPException(status_code=502, detail=str(exc)) from exc
+
+
 @app.get("/health")
 def health_check() -> dict[str, str]:
     return {"status": "ok"}
 
 
+def _starts_at_capital(
+    df: pd.DataFrame,
+    initial_capital: float,
+    return_columns: list[str],
+    equity_columns: list[str],
+) -> bool:
+    return all(df[column].iat[0] == 0.0 for column in return_columns if column in df.columns) and all(
+        df[column].iat[0] == initial_capital for column in equity_columns if column in df.columns
+    )
+
+
 def _apply_horizon_window_and_rebase(
     df: pd.DataFrame,
     horizon: str,
@@ -70,12 +151,17 @@ def _apply_horizon_window_and_rebase(
         return df
 
     latest_date = pd.Timestamp(df["date"].iloc[-1])
-    cutoff = (latest_date - pd.DateOffset(months=_HORIZON_MONTHS[horizon])).date()
-    window_df = df[df["date"] >= cutoff].copy()
-    if window_df.empty:
-        window_df = df.copy()
+    cutoff = (latest_date - _HORIZON_OFFSETS[horizon]).date()
+    # Dates are sorted ascending, so the window start is found by binary search instead of a mask.
+    # The cutoff is strictly before the latest date, so this always lands on an existing row.
+    window_start = int(df["date"].searchsorted(cutoff, side="left"))
+
+    if window_start == 0 and _starts_at_capital(df, initial_capital, return_columns, equity_columns):
+        # The horizon covers all available history (e.g. recently listed tickers) and the curves
+        # already start flat at initial capital, so there is nothing to trim or rebase.
+        return df
 
-    window_df = window_df.reset_index(drop=True)
+    window_df = df.iloc[window_start:].reset_index(drop=True)
 
     for column in return_columns:
         if column in window_df.columns:
@@ -107,7 +193,7 @@ def _normalize_tickers(raw_tickers: list[str]) -> list[str]:
     return cleaned
 
 
-def _get_price_bars(
+async def _get_price_bars(
     data_service: AlpacaDataService,
     ticker: str,
     start_date: date,
@@ -115,14 +201,86 @@ def _get_price_bars(
     ma_timeframe: str,
 ) -> pd.DataFrame:
     if ma_timeframe == "daily":
-        return data_service.get_daily_bars(ticker, start_date, end_date)
-    return data_service.get_weekly_bars(ticker, start_date, end_date)
+        return await data_service.get_daily_bars(ticker, start_date, end_date)
+    return await data_service.get_weekly_bars(ticker, start_date, end_date)
+
+
+def _history_start(anchor: date, horizon: str, ma_timeframe: str) -> date:
+    warmup = pd.Timedelta(days=_WARMUP_BARS * _CALENDAR_DAYS_PER_BAR[ma_timeframe])
+    return (pd.Timestamp(anchor) - _HORIZON_OFFSETS[horizon] - warmup).date()
+
+
+async def _get_windowed_price_bars(
+    data_service: AlpacaDataService,
+    ticker: str,
+    start_date: date,
+    end_date: date,
+    ma_timeframe: str,
+    horizon: str | None,
+) -> pd.DataFrame:
+    """Fetch bars, skipping history older than the horizon window plus indicator warm-up.
+
+    Falls back to the full range when the trimmed fetch does not reach back far enough, which
+    happens when a series stops well before `end_date` (e.g. a delisted ticker).
+    """
+    if horizon is not None:
+        history_start = _history_start(end_date, horizon, ma_timeframe) - _HISTORY_SLACK
+        if history_start > start_date:
+            try:
+                df = await _get_price_bars(data_service, ticker, history_start, end_date, ma_timeframe)
+            except AlpacaDataError as exc:
+                if "bar data returned for symbol" not in str(exc):
+                    raise
+            else:
+                if _history_start(df["date"].iloc[-1], horizon, ma_timeframe) >= history_start:
+                    return df
+    return await _get_price_bars(data_service, ticker, start_date, end_date, ma_timeframe)
+
+
+async def _gather_price_bars(
+    data_service: AlpacaDataService,
+    symbols: list[tuple[str, str | None]],
+    start_date: date,
+    end_date: date,
+    ma_timeframe: str,
+) -> list[pd.DataFrame]:
+    """Fetch bars for each `(symbol, horizon)` pair concurrently, in input order."""
+    semaphore = asyncio.Semaphore(_MAX_CONCURRENT_FETCHES)
+
+    async def fetch(symbol: str, horizon: str | None) -> pd.DataFrame:
+        async with semaphore:
+            return await _get_windowed_price_bars(data_service, symbol, start_date, end_date, ma_timeframe, horizon)
+
+    try:
+        return await asyncio.gather(*(fetch(symbol, horizon) for symbol, horizon in symbols))
+    except AlpacaDataError as exc:
+        message = str(exc)
+        status_code = 404 if "bar data returned for symbol" in message else 502
+        raise HTTPException(status_code=status_code, detail=message) from exc
+
+
+def _resolve_end_date(start_date: date, end_date: date | None) -> date:
+    resolved = end_date or date.today()
+    if start_date >= resolved:
+        raise HTTPException(status_code=400, detail="start_date must be before end_date")
+    return resolved
+
+
+def _equity_points(df: pd.DataFrame, equity_column: str) -> list[EquityPoint]:
+    # The curve is produced by our own calculations, so per-point pydantic validation is skipped.
+    dates = df["date"].tolist()
+    equity = df[equity_column].to_numpy(dtype=np.float64).tolist()
+    return [EquityPoint.model_construct(date=point_date, equity=value) for point_date, value in zip(dates, equity)]
+
+
+def _validate_backtest_request(payload: BacktestRequest) -> None:
+    """Reject bad strategy parameters before any bars are fetched."""
+    if payload.strategy_type == "mean_reversion_zscore" and payload.mr_exit_z >= payload.mr_entry_z:
+        raise HTTPException(status_code=400, detail="mr_exit_z must be smaller than mr_entry_z.")
 
 
 def _run_single_ticker_strategy(payload: BacktestRequest, ticker_df: pd.DataFrame) -> pd.DataFrame:
     if payload.strategy_type == "mean_reversion_zscore":
-        if payload.mr_exit_z >= payload.mr_entry_z:
-            raise HTTPException(status_code=400, detail="mr_exit_z must be smaller than mr_entry_z.")
         return run_mean_reversion_zscore(
             ticker_df,
             payload.initial_capital,
@@ -141,209 +299,241 @@ def _run_single_ticker_strategy(payload: BacktestRequest, ticker_df: pd.DataFram
     )
 
 
-@app.post("/backtest", response_model=BacktestResponse)
-def backtest(payload: BacktestRequest) -> BacktestResponse:
-    end_date = payload.end_date or date.today()
-    if payload.start_date >= end_date:
-        raise HTTPException(status_code=400, detail="start_date must be before end_date")
+def _portfolio_weights(active: np.ndarray, momentum: np.ndarray, top_n: int | None) -> np.ndarray:
+    """Equal-weight the in-market tickers on each date, optionally keeping only the top-N by momentum.
 
-    try:
-        data_service = AlpacaDataService()
-        ticker_df = _get_price_bars(
-            data_service,
-            payload.ticker,
-            payload.start_date,
-            end_date,
-            payload.ma_timeframe,
-        )
-        strategy_df_full = _run_single_ticker_strategy(payload, ticker_df)
-        strategy_df = _apply_horizon_window_and_rebase(
-            strategy_df_full,
-            payload.horizon,
-            payload.initial_capital,
-            return_columns=["ret", "strategy_ret"],
-            equity_columns=["strategy_equity", "buy_hold_equity"],
-        )
+    Rows are dates and columns are tickers. Missing momentum ranks last and ties keep ticker order.
+    """
+    selected = active
+    if top_n is not None:
+        score = np.where(active, np.where(np.isnan(momentum), -np.inf, momentum), np.nan)
+        ranks = np.argsort(-score, axis=1, kind="stable").argsort(axis=1)
+        selected = active & (ranks < top_n)
 
-        strategy_metrics = compute_metrics(strategy_df["strategy_ret"])
-        buy_hold_metrics = compute_metrics(strategy_df["ret"])
+    counts = selected.sum(axis=1, keepdims=True)
+    return np.divide(selected, counts, out=np.zeros(selected.shape), where=counts > 0)
 
-        strategy_result = SeriesResult(
-            symbol=payload.ticker.upper(),
-            equity_curve=[
-                EquityPoint(date=row.date, equity=float(row.strategy_equity))
-                for row in strategy_df.itertuples(index=False)
-            ],
-            metrics=MetricSummary(**strategy_metrics),
-        )
 
-        buy_hold_result = SeriesResult(
-            symbol=payload.ticker.upper(),
-            equity_curve=[
-                EquityPoint(date=row.date, equity=float(row.buy_hold_equity))
-                for row in strategy_df.itertuples(index=False)
-            ],
-            metrics=MetricSummary(**buy_hold_metrics),
-        )
+@dataclass(frozen=True)
+class _CurveResult:
+    series: str
+    symbol: str
+    frame: pd.DataFrame
+    equity_column: str
+    return_column: str
 
-        benchmarks: list[SeriesResult] = []
-        for benchmark in ("SPY", "QQQ", "DIA"):
-            benchmark_df = _get_price_bars(
-                data_service,
-                benchmark,
-                payload.start_date,
-                end_date,
-                payload.ma_timeframe,
-            )
-            benchmark_curve_df_full = buy_and_hold(benchmark_df, payload.initial_capital)
-            benchmark_curve_df = _apply_horizon_window_and_rebase(
-                benchmark_curve_df_full,
-                payload.horizon,
-                payload.initial_capital,
-                return_columns=["ret"],
-                equity_columns=["equity"],
-            )
-            benchmark_metrics = compute_metrics(benchmark_curve_df["ret"])
-            benchmarks.append(
-                SeriesResult(
-                    symbol=benchmark,
-                    equity_curve=[
-                        EquityPoint(date=row.date, equity=float(row.equity))
-                        for row in benchmark_curve_df.itertuples(index=False)
-                    ],
-                    metrics=MetricSummary(**benchmark_metrics),
-                )
-            )
+    def metrics(self) -> dict[str, float]:
+        return compute_metrics(self.frame[self.return_column].to_numpy(dtype=np.float64))
 
-    except AlpacaDataError as exc:
-        message = str(exc)
-        status_code = 404 if "bar data returned for symbol" in message else 502
-        raise HTTPException(status_code=status_code, detail=message) from exc
+    def to_series_result(self) -> SeriesResult:
+        return SeriesResult(
+            symbol=self.symbol,
+            equity_curve=_equity_points(self.frame, self.equity_column),
+            metrics=MetricSummary(**self.metrics()),
+        )
 
-    return BacktestResponse(
-        strategy=strategy_result,
-        buy_and_hold=buy_hold_result,
-        benchmarks=benchmarks,
+
+async def _fetch_backtest_bars(
+    payload: BacktestRequest,
+    data_service: AlpacaDataService,
+) -> tuple[pd.DataFrame, dict[str, pd.DataFrame]]:
+    end_date = _resolve_end_date(payload.start_date, payload.end_date)
+    # Mean reversion carries open positions forward indefinitely, so it always needs full history.
+    ticker_horizon = None if payload.strategy_type == "mean_reversion_zscore" else payload.horizon
+    ticker_df, *benchmark_dfs = await _gather_price_bars(
+        data_service,
+        [(payload.ticker, ticker_horizon), *((benchmark, payload.horizon) for benchmark in _BENCHMARK_SYMBOLS)],
+        payload.start_date,
+        end_date,
+        payload.ma_timeframe,
     )
+    return ticker_df, dict(zip(_BENCHMARK_SYMBOLS, benchmark_dfs))
 
 
-@app.post("/portfolio-backtest", response_model=PortfolioBacktestResponse)
-def portfolio_backtest(payload: PortfolioBacktestRequest) -> PortfolioBacktestResponse:
-    end_date = payload.end_date or date.today()
-    if payload.start_date >= end_date:
-        raise HTTPException(status_code=400, detail="start_date must be before end_date")
+def _benchmark_curve(payload: BacktestRequest, benchmark: str, benchmark_df: pd.DataFrame) -> _CurveResult:
+    benchmark_curve_df_full = buy_and_hold(benchmark_df, payload.initial_capital)
+    benchmark_curve_df = _apply_horizon_window_and_rebase(
+        benchmark_curve_df_full,
+        payload.horizon,
+        payload.initial_capital,
+        return_columns=["ret"],
+        equity_columns=["equity"],
+    )
+    return _CurveResult("benchmark", benchmark, benchmark_curve_df, "equity", "ret")
+
+
+def _compute_backtest_curves(
+    payload: BacktestRequest,
+    ticker_df: pd.DataFrame,
+    benchmark_dfs: dict[str, pd.DataFrame],
+) -> list[_CurveResult]:
+    """Return the strategy, buy-and-hold and benchmark curves for a single-ticker backtest, in that order."""
+    benchmark_futures = [
+        _STRATEGY_POOL.submit(_benchmark_curve, payload, benchmark, benchmark_df)
+        for benchmark, benchmark_df in benchmark_dfs.items()
+    ]
 
-    tickers = _normalize_tickers(payload.tickers)
+    strategy_df_full = _run_single_ticker_strategy(payload, ticker_df)
+    strategy_df = _apply_horizon_window_and_rebase(
+        strategy_df_full,
+        payload.horizon,
+        payload.initial_capital,
+        return_columns=["ret", "strategy_ret"],
+        equity_columns=["strategy_equity", "buy_hold_equity"],
+    )
 
-    try:
-        data_service = AlpacaDataService()
-
-        strategy_inputs: dict[str, pd.DataFrame] = {}
-        for ticker in tickers:
-            ticker_df = data_service.get_weekly_bars(ticker, payload.start_date, end_date)
-            strategy_inputs[ticker] = run_sma_crossover(ticker_df, initial_capital=1.0)[
-                ["date", "ret", "position"]
-            ]
-
-        all_dates = sorted({d for df in strategy_inputs.values() for d in df["date"].tolist()})
-        if not all_dates:
-            raise AlpacaDataError("No weekly bar data returned for selected tickers.")
-
-        returns_wide = pd.DataFrame(index=all_dates)
-        positions_wide = pd.DataFrame(index=all_dates)
-        for ticker in tickers:
-            ticker_df = strategy_inputs[ticker].set_index("date")
-            returns_wide[ticker] = ticker_df["ret"]
-            positions_wide[ticker] = ticker_df["position"]
-
-        returns_wide = returns_wide.sort_index().fillna(0.0)
-        positions_wide = positions_wide.sort_index().fillna(0.0)
-        momentum_wide = (1.0 + returns_wide).rolling(window=26, min_periods=4).apply(np.prod, raw=True) - 1.0
-
-        top_n = min(payload.top_n, len(tickers))
-        portfolio_rets: list[float] = []
-        latest_weights: dict[str, float] = {ticker: 0.0 for ticker in tickers}
-        latest_in_market: dict[str, bool] = {ticker: False for ticker in tickers}
-
-        for current_date in returns_wide.index:
-            active = [ticker for ticker in tickers if float(positions_wide.at[current_date, ticker]) > 0]
-            selected = active
-            if payload.use_ranking and active:
-                ranked = sorted(
-                    active,
-                    key=lambda ticker: float(momentum_wide.at[current_date, ticker])
-                    if pd.notna(momentum_wide.at[current_date, ticker])
-                    else float("-inf"),
-                    reverse=True,
-                )
-                selected = ranked[:top_n]
+    symbol = payload.ticker.upper()
+    return [
+        _CurveResult("strategy", symbol, strategy_df, "strategy_equity", "strategy_ret"),
+        _CurveResult("buy_and_hold", symbol, strategy_df, "buy_hold_equity", "ret"),
+        *(future.result() for future in benchmark_futures),
+    ]
 
-            weights = {ticker: 0.0 for ticker in tickers}
-            if selected:
-                weight = 1.0 / len(selected)
-                for ticker in selected:
-                    weights[ticker] = weight
 
-            portfolio_rets.append(
-                float(sum(weights[ticker] * float(returns_wide.at[current_date, ticker]) for ticker in tickers))
+def _backtest_json_response(
+    payload: BacktestRequest,
+    ticker_df: pd.DataFrame,
+    benchmark_dfs: dict[str, pd.DataFrame],
+) -> ORJSONResponse:
+    curves = _compute_backtest_curves(payload, ticker_df, benchmark_dfs)
+    strategy_result, buy_hold_result, *benchmark_results = _STRATEGY_POOL.map(_CurveResult.to_series_result, curves)
+    response = BacktestResponse(
+        strategy=strategy_result,
+        buy_and_hold=buy_hold_result,
+        benchmarks=benchmark_results,
+    )
+    return ORJSONResponse(content=response.model_dump())
+
+
+def _backtest_arrow_response(
+    payload: BacktestRequest,
+    ticker_df: pd.DataFrame,
+    benchmark_dfs: dict[str, pd.DataFrame],
+) -> Response:
+    curves = _compute_backtest_curves(payload, ticker_df, benchmark_dfs)
+    metrics = [{"series": curve.series, "symbol": curve.symbol, **curve.metrics()} for curve in curves]
+    schema = _ARROW_CURVE_SCHEMA.with_metadata({"metrics": orjson.dumps(metrics)})
+
+    sink = pa.BufferOutputStream()
+    with pa.ipc.new_stream(sink, schema) as writer:
+        for curve in curves:
+            rows = len(curve.frame)
+            writer.write_batch(
+                pa.record_batch(
+                    [
+                        pa.repeat(curve.series, rows),
+                        pa.repeat(curve.symbol, rows),
+                        pa.array(curve.frame["date"].to_numpy(), type=pa.date32()),
+                        pa.array(curve.frame[curve.equity_column].to_numpy(dtype=np.float64)),
+                    ],
+                    schema=schema,
+                )
             )
-            latest_weights = weights
-            latest_in_market = {ticker: ticker in active for ticker in tickers}
-
-        portfolio_df_full = pd.DataFrame(
-            {
-                "date": returns_wide.index.to_list(),
-                "strategy_ret": portfolio_rets,
-                "basket_ret": returns_wide.mean(axis=1).astype(float).tolist(),
-            }
-        )
-        portfolio_df_full["strategy_equity"] = payload.initial_capital * (1.0 + portfolio_df_full["strategy_ret"]).cumprod()
-        portfolio_df_full["buy_hold_equity"] = payload.initial_capital * (1.0 + portfolio_df_full["basket_ret"]).cumprod()
+    return Response(content=sink.getvalue().to_pybytes(), media_type=_ARROW_STREAM_MEDIA_TYPE)
 
-        portfolio_df = _apply_horizon_window_and_rebase(
-            portfolio_df_full,
-            payload.horizon,
-            payload.initial_capital,
-            return_columns=["strategy_ret", "basket_ret"],
-            equity_columns=["strategy_equity", "buy_hold_equity"],
-        )
 
-        strategy_metrics = compute_metrics(portfolio_df["strategy_ret"])
-        basket_metrics = compute_metrics(portfolio_df["basket_ret"])
+@app.post("/backtest", response_model=BacktestResponse)
+async def backtest(
+    payload: BacktestRequest,
+    data_service: AlpacaDataService = Depends(get_data_service),
+) -> ORJSONResponse:
+    _validate_backtest_request(payload)
+    ticker_df, benchmark_dfs = await _fetch_backtest_bars(payload, data_service)
+    return await asyncio.to_thread(_backtest_json_response, payload, ticker_df, benchmark_dfs)
+
+
+@app.post(
+    "/backtest/arrow",
+    response_class=Response,
+    responses={200: {"content": {_ARROW_STREAM_MEDIA_TYPE: {}}}},
+)
+async def backtest_arrow(
+    payload: BacktestRequest,
+    data_service: AlpacaDataService = Depends(get_data_service),
+) -> Response:
+    """Same backtest as `/backtest`, with equity curves as an Arrow IPC stream (one record batch per series).
+
+    Per-series metrics travel in the schema metadata under `metrics`, in batch order.
+    """
+    _validate_backtest_request(payload)
+    ticker_df, benchmark_dfs = await _fetch_backtest_bars(payload, data_service)
+    return await asyncio.to_thread(_backtest_arrow_response, payload, ticker_df, benchmark_dfs)
+
+
+def _sma_portfolio_inputs(ticker_df: pd.DataFrame) -> pd.DataFrame:
+    return run_sma_crossover(ticker_df, initial_capital=1.0)[["date", "ret", "position"]].set_index("date")
+
+
+def _portfolio_json_response(
+    payload: PortfolioBacktestRequest,
+    ticker_dfs: dict[str, pd.DataFrame],
+    spy_df: pd.DataFrame,
+) -> ORJSONResponse:
+    tickers = list(ticker_dfs)
+    ticker_frames = dict(zip(tickers, _STRATEGY_POOL.map(_sma_portfolio_inputs, ticker_dfs.values())))
+    returns_wide = pd.concat({ticker: df["ret"] for ticker, df in ticker_frames.items()}, axis=1).sort_index()
+    positions_wide = pd.concat({ticker: df["position"] for ticker, df in ticker_frames.items()}, axis=1).sort_index()
+    if returns_wide.empty:
+        raise HTTPException(status_code=502, detail="No weekly bar data returned for selected tickers.")
+
+    # Everything from here to the API boundary runs on dates x tickers NumPy matrices.
+    returns = returns_wide.fillna(0.0).to_numpy(dtype=np.float64)
+    active = positions_wide.fillna(0.0).to_numpy(dtype=np.float64) > 0
+    momentum = np.expm1(pd.DataFrame(np.log1p(returns)).rolling(window=26, min_periods=4).sum().to_numpy())
+
+    top_n = min(payload.top_n, len(tickers)) if payload.use_ranking else None
+    weights = _portfolio_weights(active, momentum, top_n)
+    portfolio_rets = (weights * returns).sum(axis=1)
+    basket_rets = returns.mean(axis=1)
+    latest_weights = dict(zip(tickers, weights[-1].tolist()))
+    latest_in_market = dict(zip(tickers, active[-1].tolist()))
+
+    portfolio_df_full = pd.DataFrame(
+        {
+            "date": returns_wide.index.to_list(),
+            "strategy_ret": portfolio_rets,
+            "basket_ret": basket_rets,
+            "strategy_equity": equity_from_returns(portfolio_rets, payload.initial_capital),
+            "buy_hold_equity": equity_from_returns(basket_rets, payload.initial_capital),
+        }
+    )
 
-        spy_df = data_service.get_weekly_bars("SPY", payload.start_date, end_date)
-        spy_curve_df_full = buy_and_hold(spy_df, payload.initial_capital)
-        spy_curve_df = _apply_horizon_window_and_rebase(
-            spy_curve_df_full,
-            payload.horizon,
-            payload.initial_capital,
-            return_columns=["ret"],
-            equity_columns=["equity"],
-        )
-        spy_metrics = compute_metrics(spy_curve_df["ret"])
+    portfolio_df = _apply_horizon_window_and_rebase(
+        portfolio_df_full,
+        payload.horizon,
+        payload.initial_capital,
+        return_columns=["strategy_ret", "basket_ret"],
+        equity_columns=["strategy_equity", "buy_hold_equity"],
+    )
 
-    except AlpacaDataError as exc:
-        message = str(exc)
-        status_code = 404 if "No weekly bar data returned for symbol" in message else 502
-        raise HTTPException(status_code=status_code, detail=message) from exc
+    strategy_metrics = compute_metrics(portfolio_df["strategy_ret"].to_numpy(dtype=np.float64))
+    basket_metrics = compute_metrics(portfolio_df["basket_ret"].to_numpy(dtype=np.float64))
+
+    spy_curve_df_full = buy_and_hold(spy_df, payload.initial_capital)
+    spy_curve_df = _apply_horizon_window_and_rebase(
+        spy_curve_df_full,
+        payload.horizon,
+        payload.initial_capital,
+        return_columns=["ret"],
+        equity_columns=["equity"],
+    )
+    spy_metrics = compute_metrics(spy_curve_df["ret"].to_numpy(dtype=np.float64))
 
     strategy_result = SeriesResult(
         symbol="PORTFOLIO SMA",
-        equity_curve=[
-            EquityPoint(date=row.date, equity=float(row.strategy_equity)) for row in portfolio_df.itertuples(index=False)
-        ],
+        equity_curve=_equity_points(portfolio_df, "strategy_equity"),
         metrics=MetricSummary(**strategy_metrics),
     )
 
     buy_hold_result = SeriesResult(
         symbol="USER BASKET BUY&HOLD",
-        equity_curve=[EquityPoint(date=row.date, equity=float(row.buy_hold_equity)) for row in portfolio_df.itertuples(index=False)],
+        equity_curve=_equity_points(portfolio_df, "buy_hold_equity"),
         metrics=MetricSummary(**basket_metrics),
     )
 
     benchmark_result = SeriesResult(
         symbol="SPY",
-        equity_curve=[EquityPoint(date=row.date, equity=float(row.equity)) for row in spy_curve_df.itertuples(index=False)],
+        equity_curve=_equity_points(spy_curve_df, "equity"),
         metrics=MetricSummary(**spy_metrics),
     )
 
@@ -356,9 +546,28 @@ def portfolio_backtest(payload: PortfolioBacktestRequest) -> PortfolioBacktestRe
         for ticker in tickers
     ]
 
-    return PortfolioBacktestResponse(
+    response = PortfolioBacktestResponse(
         strategy=strategy_result,
         buy_and_hold=buy_hold_result,
         benchmark=benchmark_result,
         current_holdings=current_holdings,
     )
+    return ORJSONResponse(content=response.model_dump())
+
+
+@app.post("/portfolio-backtest", response_model=PortfolioBacktestResponse)
+async def portfolio_backtest(
+    payload: PortfolioBacktestRequest,
+    data_service: AlpacaDataService = Depends(get_data_service),
+) -> ORJSONResponse:
+    end_date = _resolve_end_date(payload.start_date, payload.end_date)
+    tickers = _normalize_tickers(payload.tickers)
+
+    *ticker_dfs, spy_df = await _gather_price_bars(
+        data_service,
+        [(symbol, payload.horizon) for symbol in [*tickers, "SPY"]],
+        payload.start_date,
+        end_date,
+        "weekly",
+    )
+    return await asyncio.to_thread(_portfolio_json_response, payload, dict(zip(tickers, ticker_dfs)), spy_df)
@@ -0,0 +1,10 @@
+"""Optional numba JIT decorator shared by the numeric kernels."""
+
+from __future__ import annotations
+
+try:
+    from numba import njit
+except ImportError:  # Fall back to plain Python where numba has no wheel for the interpreter.
+
+    def njit(*args, **kwargs):
+        return lambda func: func
@@ -2,48 +2,125 @@
 
 from __future__ import annotations
 
-from dataclasses import dataclass
-from datetime import date, datetime
-import time
+import asyncio
+from datetime import date
 from typing import Any
 
+from cachetools import TTLCache
 import httpx
+import numpy as np
+import orjson
 import pandas as pd
 
 from app.config import settings
 
 
-@dataclass(frozen=True)
-class Bar:
-    timestamp: datetime
-    close: float
-
-
 class AlpacaDataError(RuntimeError):
     """Raised when Alpaca data API calls fail."""
 
 
+_HTTP_LIMITS = httpx.Limits(max_connections=100, max_keepalive_connections=40, keepalive_expiry=30.0)
+
+# Historical bars only change once per bar interval, so repeat fetches (notably the
+# SPY/QQQ/DIA benchmarks) are served from memory for an hour. Entries are the bare
+# (dates, closes) arrays; every hit gets a fresh frame built from them. Only the event loop
+# touches the cache, so it needs no lock.
+_bars_cache: TTLCache[tuple[str, str, date, date, str], tuple[np.ndarray, np.ndarray]] = TTLCache(
+    maxsize=2048, ttl=3600
+)
+
+
+def clear_bars_cache() -> None:
+    _bars_cache.clear()
+
+
 class AlpacaDataService:
     _max_attempts = 3
     _retryable_status_codes = {429, 500, 502, 503, 504}
 
-    def __init__(self) -> None:
+    def __init__(self, transport: httpx.AsyncBaseTransport | None = None) -> None:
         if not settings.alpaca_api_key or not settings.alpaca_api_secret:
             raise AlpacaDataError("Missing ALPACA_API_KEY or ALPACA_API_SECRET environment variables.")
 
-        self._base_url = settings.alpaca_data_base_url.rstrip("/")
-        self._headers = {
-            "APCA-API-KEY-ID": settings.alpaca_api_key,
-            "APCA-API-SECRET-KEY": settings.alpaca_api_secret,
-        }
-
-    def get_weekly_bars(self, symbol: str, start: date, end: date) -> pd.DataFrame:
-        return self._get_bars(symbol=symbol, start=start, end=end, timeframe="1Week", timeframe_label="weekly")
-
-    def get_daily_bars(self, symbol: str, start: date, end: date) -> pd.DataFrame:
-        return self._get_bars(symbol=symbol, start=start, end=end, timeframe="1Day", timeframe_label="daily")
-
-    def _get_bars(self, symbol: str, start: date, end: date, timeframe: str, timeframe_label: str) -> pd.DataFrame:
+        # One pooled client per service so consecutive symbol fetches reuse keep-alive connections.
+        self._client = httpx.AsyncClient(
+            base_url=settings.alpaca_data_base_url.rstrip("/"),
+            headers={
+                "APCA-API-KEY-ID": settings.alpaca_api_key,
+                "APCA-API-SECRET-KEY": settings.alpaca_api_secret,
+            },
+            timeout=20.0,
+            limits=_HTTP_LIMITS,
+            transport=transport,
+        )
+
+    async def close(self) -> None:
+        await self._client.aclose()
+
+    async def get_weekly_bars(self, symbol: str, start: date, end: date) -> pd.DataFrame:
+        return await self._get_bars(symbol=symbol, start=start, end=end, timeframe="1Week", timeframe_label="weekly")
+
+    async def get_daily_bars(self, symbol: str, start: date, end: date) -> pd.DataFrame:
+        return await self._get_bars(symbol=symbol, start=start, end=end, timeframe="1Day", timeframe_label="daily")
+
+    async def _get_bars(
+        self,
+        symbol: str,
+        start: date,
+        end: date,
+        timeframe: str,
+        timeframe_label: str,
+    ) -> pd.DataFrame:
+        cache_key = (symbol.upper(), timeframe, start, end, settings.alpaca_feed)
+        cached = _bars_cache.get(cache_key)
+        if cached is None:
+            cached = await self._fetch_bars(symbol, start, end, timeframe, timeframe_label)
+            _bars_cache[cache_key] = cached
+        dates, closes = cached
+        # Building from a dict copies the arrays, so callers writing into the frame never touch the cache.
+        return pd.DataFrame({"date": dates, "close": closes})
+
+    async def _get_page(self, symbol: str, params: dict[str, Any], page_token: str | None) -> dict[str, Any]:
+        request_params = params.copy()
+        if page_token:
+            request_params["page_token"] = page_token
+
+        response: httpx.Response | None = None
+        for attempt in range(1, self._max_attempts + 1):
+            try:
+                response = await self._client.get("/v2/stocks/bars", params=request_params)
+            except httpx.TimeoutException as exc:
+                if attempt == self._max_attempts:
+                    raise AlpacaDataError(
+                        f"Alpaca data request timed out for {symbol} after {self._max_attempts} attempts."
+                    ) from exc
+                await asyncio.sleep(0.5 * attempt)
+                continue
+
+            if response.status_code in self._retryable_status_codes and attempt < self._max_attempts:
+                await asyncio.sleep(0.5 * attempt)
+                continue
+            break
+
+        if response is None:
+            raise AlpacaDataError(f"Unable to complete Alpaca data request for {symbol}.")
+
+        if response.status_code != 200:
+            raise AlpacaDataError(
+                f"Alpaca data request failed for {symbol}: "
+                f"{response.status_code} {response.text}"
+            )
+
+        return orjson.loads(response.content)
+
+    async def _fetch_bars(
+        self,
+        symbol: str,
+        start: date,
+        end: date,
+        timeframe: str,
+        timeframe_label: str,
+    ) -> tuple[np.ndarray, np.ndarray]:
         params: dict[str, Any] = {
             "symbols": symbol.upper(),
             "timeframe": timeframe,
@@ -55,67 +132,28 @@ class AlpacaDataService:
             "sort": "asc",
         }
 
-        all_bars: list[Bar] = []
-        page_token: str | None = None
-
-        with httpx.Client(timeout=20.0) as client:
-            while True:
-                request_params = params.copy()
-                if page_token:
-                    request_params["page_token"] = page_token
-
-                response: httpx.Response | None = None
-                for attempt in range(1, self._max_attempts + 1):
-                    try:
-                        response = client.get(
-                            f"{self._base_url}/v2/stocks/bars",
-                            params=request_params,
-                            headers=self._headers,
-                        )
-                    except httpx.TimeoutException as exc:
-                        if attempt == self._max_attempts:
-                            raise AlpacaDataError(
-                                f"Alpaca data request timed out for {symbol} after {self._max_attempts} attempts."
-                            ) from exc
-                        time.sleep(0.5 * attempt)
-                        continue
-
-                    if response.status_code in self._retryable_status_codes and attempt < self._max_attempts:
-                        time.sleep(0.5 * attempt)
-                        continue
-                    break
-
-                if response is None:
-                    raise AlpacaDataError(f"Unable to complete Alpaca data request for {symbol}.")
-
-                if response.status_code != 200:
-                    raise AlpacaDataError(
-                        f"Alpaca data request failed for {symbol}: "
-                        f"{response.status_code} {response.text}"
-                    )
-
-                payload = response.json()
-                symbol_bars = payload.get("bars", {}).get(symbol.upper(), [])
-                for raw in symbol_bars:
-                    all_bars.append(
-                        Bar(
-                            timestamp=datetime.fromisoformat(raw["t"].replace("Z", "+00:00")),
-                            close=float(raw["c"]),
-                        )
-                    )
+        days: list[str] = []
+        closes: list[float] = []
 
+        page_task: asyncio.Task[dict[str, Any]] | None = asyncio.create_task(self._get_page(symbol, params, None))
+        try:
+            while page_task is not None:
+                payload = await page_task
                 page_token = payload.get("next_page_token")
-                if not page_token:
-                    break
+                # Request the next page before unpacking this one so its round trip overlaps our own work.
+                page_task = asyncio.create_task(self._get_page(symbol, params, page_token)) if page_token else None
 
-        if not all_bars:
+                symbol_bars = payload.get("bars", {}).get(symbol.upper(), [])
+                # Timestamps are UTC RFC 3339 ("2024-01-02T05:00:00Z"); only the calendar day is used.
+                days.extend(raw["t"][:10] for raw in symbol_bars)
+                closes.extend(raw["c"] for raw in symbol_bars)
+        finally:
+            if page_task is not None:
+                page_task.cancel()
+
+        if not days:
             raise AlpacaDataError(f"No {timeframe_label} bar data returned for symbol '{symbol.upper()}'.")
 
-        df = pd.DataFrame(
-            {
-                "date": [bar.timestamp.date() for bar in all_bars],
-                "close": [bar.close for bar in all_bars],
-            }
-        ).drop_duplicates(subset=["date"])
-
-        return df.sort_values("date").reset_index(drop=True)
+        # np.unique sorts the days and indexes each one's first bar, dropping any repeated day.
+        dates, first_bar = np.unique(np.array(days, dtype="datetime64[D]"), return_index=True)
+        return dates.astype(object), np.asarray(closes, dtype=np.float64)[first_bar]
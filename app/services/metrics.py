@@ -5,32 +5,60 @@ from __future__ import annotations
 import numpy as np
 import pandas as pd
 
+from app.services._jit import njit
+
 
 WEEKS_PER_YEAR = 52
 
 
-def compute_metrics(returns: pd.Series) -> dict[str, float]:
-    returns = returns.fillna(0.0)
+@njit(cache=True, nogil=True)
+def _return_path_stats(values: np.ndarray) -> tuple[float, float, float, float]:
+    """Final growth of 1.0, max drawdown, mean and population std of a return series in one pass.
 
-    equity = (1.0 + returns).cumprod()
-    total_return = float(equity.iloc[-1] - 1.0)
+    Missing returns count as flat. The variance is accumulated with Welford's update, so it
+    stays exact for a constant series.
+    """
+    equity = 1.0
+    peak = -np.inf
+    max_drawdown = 0.0
+    mean = 0.0
+    sum_sq_dev = 0.0
+    for i in range(values.shape[0]):
+        value = values[i]
+        if np.isnan(value):
+            value = 0.0
 
-    periods = len(returns)
-    years = max(periods / WEEKS_PER_YEAR, 1 / WEEKS_PER_YEAR)
-    cagr = float(equity.iloc[-1] ** (1.0 / years) - 1.0)
+        equity *= 1.0 + value
+        if equity > peak:
+            peak = equity
+        drawdown = equity / peak - 1.0
+        if drawdown < max_drawdown:
+            max_drawdown = drawdown
+
+        delta = value - mean
+        mean += delta / (i + 1)
+        sum_sq_dev += delta * (value - mean)
+
+    return equity, max_drawdown, mean, np.sqrt(sum_sq_dev / values.shape[0])
 
-    running_max = equity.cummax()
-    drawdown = (equity / running_max) - 1.0
-    max_drawdown = float(drawdown.min())
 
-    volatility = float(returns.std(ddof=0) * np.sqrt(WEEKS_PER_YEAR))
-    mean_annual_return = float(returns.mean() * WEEKS_PER_YEAR)
+def compute_metrics(returns: pd.Series | np.ndarray) -> dict[str, float]:
+    values = np.ascontiguousarray(returns, dtype=np.float64)
+    final_equity, max_drawdown, mean_return, std_return = _return_path_stats(values)
+    total_return = final_equity - 1.0
+
+    periods = len(values)
+    years = max(periods / WEEKS_PER_YEAR, 1 / WEEKS_PER_YEAR)
+    cagr = float(final_equity ** (1.0 / years) - 1.0)
+
+    volatility = float(std_return * np.sqrt(WEEKS_PER_YEAR))
+    mean_annual_return = float(mean_return * WEEKS_PER_YEAR)
     sharpe = mean_annual_return / volatility if volatility > 0 else 0.0
 
     return {
-        "cumulative_return": total_return,
+        "cumulative_return": float(total_return),
         "cagr": cagr,
-        "max_drawdown": max_drawdown,
+        "max_drawdown": float(max_drawdown),
         "volatility": volatility,
         "sharpe_ratio": float(sharpe),
     }
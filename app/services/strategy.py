@@ -2,8 +2,80 @@
 
 from __future__ import annotations
 
+import numpy as np
 import pandas as pd
 
+from app.services._jit import njit
+
+
+# Relative SMA spread treated as an exact tie. Real crossovers on cent prices differ by at
+# least 0.01 / 20 per share, many orders of magnitude above float rounding.
+_SMA_TIE_RTOL = 1e-12
+
+
+def equity_from_returns(returns: np.ndarray, initial_capital: float) -> np.ndarray:
+    """Compound per-bar returns into an equity curve along the last axis."""
+    return initial_capital * np.cumprod(1.0 + np.asarray(returns, dtype=np.float64), axis=-1)
+
+
+def _strategy_frame(df: pd.DataFrame, columns: dict[str, np.ndarray]) -> pd.DataFrame:
+    """Build a strategy's output frame in one go: the input dates plus its computed columns."""
+    return pd.DataFrame({"date": df["date"].to_numpy(), **columns}, index=df.index)
+
+
+def _simple_returns(close: np.ndarray) -> np.ndarray:
+    """Bar-over-bar returns of a close array, flat on the first bar."""
+    returns = np.empty(close.shape[0])
+    returns[:1] = 0.0
+    np.divide(close[1:], close[:-1], out=returns[1:])
+    returns[1:] -= 1.0
+    return returns
+
+
+def _next_bar_position(signal: np.ndarray) -> np.ndarray:
+    """Act on each bar's signal at the following bar; flat on the first bar."""
+    position = np.empty_like(signal)
+    position[:1] = 0.0
+    position[1:] = signal[:-1]
+    return position
+
+
+@njit(cache=True, nogil=True)
+def _rolling_mean(values: np.ndarray, window: int) -> np.ndarray:
+    """Trailing mean over `window` bars in one O(n) pass; NaN until the window fills.
+
+    Same scheme as pandas' rolling mean: a running window sum with Kahan-compensated add and
+    remove, so rounding stays at window scale however long the history, and a window of
+    identical values returns that value exactly.
+    """
+    result = np.full(values.shape[0], np.nan)
+    total = 0.0
+    compensation = 0.0
+    same_run = 0
+
+    for i in range(values.shape[0]):
+        value = values[i]
+        adjusted = value - compensation
+        new_total = total + adjusted
+        compensation = (new_total - total) - adjusted
+        total = new_total
+
+        if i >= window:
+            adjusted = -values[i - window] - compensation
+            new_total = total + adjusted
+            compensation = (new_total - total) - adjusted
+            total = new_total
+
+        if i > 0 and value == values[i - 1]:
+            same_run += 1
+        else:
+            same_run = 1
+
+        if i >= window - 1:
+            result[i] = value if same_run >= window else total / window
+
+    return result
+
 
 def run_sma_crossover(
     df: pd.DataFrame,
@@ -14,104 +86,151 @@ def run_sma_crossover(
 
     Uses a one-bar lag on signal to avoid lookahead bias.
     """
-    data = df.copy()
-    data["ret"] = data["close"].pct_change().fillna(0.0)
-    data["sma_5"] = data["close"].rolling(window=5, min_periods=5).mean()
-    data["sma_20"] = data["close"].rolling(window=20, min_periods=20).mean()
-    ma_ready = data["sma_5"].notna() & data["sma_20"].notna()
-
+    close = df["close"].to_numpy(dtype=np.float64)
+    ret = _simple_returns(close)
+    sma_5 = _rolling_mean(close, 5)
+    sma_20 = _rolling_mean(close, 20)
+
+    # The spread is NaN until both averages are ready, and NaN compares false, so flat until then.
+    # Spreads within rounding of zero are ties and take the short/flat side of the <= convention.
+    spread = sma_5 - sma_20
+    signal = (spread > _SMA_TIE_RTOL * np.abs(sma_20)).astype(np.float64)
     if position_mode == "long_short":
-        data["signal"] = 0.0
-        data.loc[ma_ready & (data["sma_5"] > data["sma_20"]), "signal"] = 1.0
-        data.loc[ma_ready & (data["sma_5"] <= data["sma_20"]), "signal"] = -1.0
-    else:
-        data["signal"] = 0.0
-        data.loc[ma_ready & (data["sma_5"] > data["sma_20"]), "signal"] = 1.0
-
-    data["position"] = data["signal"].shift(1).fillna(0.0)
-    data["strategy_ret"] = data["position"] * data["ret"]
-
-    data["strategy_equity"] = initial_capital * (1.0 + data["strategy_ret"]).cumprod()
-    data["buy_hold_equity"] = initial_capital * (1.0 + data["ret"]).cumprod()
-
-    return data
+        signal = np.where(np.isnan(spread), 0.0, 2.0 * signal - 1.0)
+
+    position = _next_bar_position(signal)
+    strategy_ret = position * ret
+    strategy_equity, buy_hold_equity = equity_from_returns(np.stack([strategy_ret, ret]), initial_capital)
+
+    return _strategy_frame(
+        df,
+        {
+            "close": close,
+            "ret": ret,
+            "sma_5": sma_5,
+            "sma_20": sma_20,
+            "signal": signal,
+            "position": position,
+            "strategy_ret": strategy_ret,
+            "strategy_equity": strategy_equity,
+            "buy_hold_equity": buy_hold_equity,
+        },
+    )
 
 
 def buy_and_hold(df: pd.DataFrame, initial_capital: float) -> pd.DataFrame:
     """Compute buy-and-hold equity curve for a price series."""
-    data = df.copy()
-    data["ret"] = data["close"].pct_change().fillna(0.0)
-    data["equity"] = initial_capital * (1.0 + data["ret"]).cumprod()
-    return data
-
-
-def run_mean_reversion_zscore(
-    df: pd.DataFrame,
-    initial_capital: float,
-    lookback: int = 20,
-    entry_z: float = 2.0,
-    exit_z: float = 0.5,
-    stop_loss_pct: float | None = None,
-    max_holding_bars: int | None = None,
-    allow_short: bool = True,
-) -> pd.DataFrame:
-    """Run long/short mean reversion using rolling z-score and one-bar execution lag."""
-    data = df.copy()
-    data["ret"] = data["close"].pct_change().fillna(0.0)
-    data["mean"] = data["close"].rolling(window=lookback, min_periods=lookback).mean()
-    data["std"] = data["close"].rolling(window=lookback, min_periods=lookback).std()
-    data["std"] = data["std"].where(data["std"] != 0.0)
-    data["zscore"] = (data["close"] - data["mean"]) / data["std"]
-
-    signal: list[float] = []
+    close = df["close"].to_numpy(dtype=np.float64)
+    ret = _simple_returns(close)
+    return _strategy_frame(df, {"close": close, "ret": ret, "equity": equity_from_returns(ret, initial_capital)})
+
+
+@njit(cache=True, nogil=True)
+def _mean_reversion_signal(
+    close: np.ndarray,
+    zscore: np.ndarray,
+    entry_z: float,
+    exit_z: float,
+    stop_loss_pct: float,
+    max_holding_bars: int,
+    allow_short: bool,
+) -> np.ndarray:
+    """Walk the z-score entry/exit state machine bar by bar.
+
+    Numba has no Optional, so a NaN `stop_loss_pct` disables the stop and `max_holding_bars=0`
+    disables the timed exit.
+    """
+    signal = np.empty(close.shape[0])
     active_position = 0.0
-    entry_price: float | None = None
+    entry_price = np.nan
     bars_held = 0
 
-    for row in data.itertuples(index=False):
-        zscore = row.zscore
-        close = float(row.close)
-        zscore_ready = pd.notna(zscore)
+    for i in range(close.shape[0]):
+        price = close[i]
+        z = zscore[i]
+        zscore_ready = not np.isnan(z)
 
         if active_position == 0.0:
-            if zscore_ready and float(zscore) <= -entry_z:
+            if zscore_ready and z <= -entry_z:
                 active_position = 1.0
-                entry_price = close
+                entry_price = price
                 bars_held = 0
-            elif zscore_ready and allow_short and float(zscore) >= entry_z:
+            elif zscore_ready and allow_short and z >= entry_z:
                 active_position = -1.0
-                entry_price = close
+                entry_price = price
                 bars_held = 0
-            signal.append(active_position)
+            signal[i] = active_position
             continue
 
         bars_held += 1
         exit_signal = False
-        if active_position > 0 and zscore_ready and float(zscore) >= -exit_z:
+        if active_position > 0 and zscore_ready and z >= -exit_z:
             exit_signal = True
-        if active_position < 0 and zscore_ready and float(zscore) <= exit_z:
+        if active_position < 0 and zscore_ready and z <= exit_z:
             exit_signal = True
 
         stop_hit = False
-        if stop_loss_pct is not None and entry_price is not None and entry_price > 0:
+        if not np.isnan(stop_loss_pct) and entry_price > 0:
             if active_position > 0:
-                current_pnl = (close / entry_price) - 1.0
+                current_pnl = (price / entry_price) - 1.0
             else:
-                current_pnl = (entry_price / close) - 1.0
+                current_pnl = (entry_price / price) - 1.0
             stop_hit = current_pnl <= -stop_loss_pct
 
-        timed_exit = max_holding_bars is not None and bars_held >= max_holding_bars
+        timed_exit = max_holding_bars > 0 and bars_held >= max_holding_bars
         if exit_signal or stop_hit or timed_exit:
             active_position = 0.0
-            entry_price = None
+            entry_price = np.nan
             bars_held = 0
 
-        signal.append(active_position)
+        signal[i] = active_position
 
-    data["signal"] = signal
-    data["position"] = data["signal"].shift(1).fillna(0.0)
-    data["strategy_ret"] = data["position"] * data["ret"]
-    data["strategy_equity"] = initial_capital * (1.0 + data["strategy_ret"]).cumprod()
-    data["buy_hold_equity"] = initial_capital * (1.0 + data["ret"]).cumprod()
+    return signal
 
-    return data
+
+def run_mean_reversion_zscore(
+    df: pd.DataFrame,
+    initial_capital: float,
+    lookback: int = 20,
+    entry_z: float = 2.0,
+    exit_z: float = 0.5,
+    stop_loss_pct: float | None = None,
+    max_holding_bars: int | None = None,
+    allow_short: bool = True,
+) -> pd.DataFrame:
+    """Run long/short mean reversion using rolling z-score and one-bar execution lag."""
+    close = df["close"].to_numpy(dtype=np.float64)
+    ret = _simple_returns(close)
+    mean = _rolling_mean(close, lookback)
+    std = pd.Series(close).rolling(window=lookback, min_periods=lookback).std().to_numpy()
+    std = np.where(std != 0.0, std, np.nan)
+    zscore = (close - mean) / std
+
+    signal = _mean_reversion_signal(
+        close,
+        zscore,
+        entry_z,
+        exit_z,
+        np.nan if stop_loss_pct is None else stop_loss_pct,
+        0 if max_holding_bars is None else max_holding_bars,
+        allow_short,
+    )
+    position = _next_bar_position(signal)
+    strategy_ret = position * ret
+    strategy_equity, buy_hold_equity = equity_from_returns(np.stack([strategy_ret, ret]), initial_capital)
+
+    return _strategy_frame(
+        df,
+        {
+            "close": close,
+            "ret": ret,
+            "mean": mean,
+            "std": std,
+            "zscore": zscore,
+            "signal": signal,
+            "position": position,
+            "strategy_ret": strategy_ret,
+            "strategy_equity": strategy_equity,
+            "buy_hold_equity": buy_hold_equity,
+        },
+    )
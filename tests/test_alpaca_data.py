@@ -0,0 +1,61 @@
+import asyncio
+from datetime import date
+
+import httpx
+import pytest
+
+import app.services.alpaca_data as alpaca_data_module
+from app.config import Settings
+from app.services.alpaca_data import AlpacaDataService, clear_bars_cache
+
+
+_PAGES = {
+    None: {
+        "bars": {"AAPL": [{"t": "2024-01-02T05:00:00Z", "c": 185.5}, {"t": "2024-01-03T05:00:00Z", "c": 184.25}]},
+        "next_page_token": "page-2",
+    },
+    "page-2": {
+        "bars": {"AAPL": [{"t": "2024-01-04T05:00:00Z", "c": 181.9}]},
+        "next_page_token": None,
+    },
+}
+
+
+class _CountingHandler:
+    def __init__(self) -> None:
+        self.calls = 0
+
+    def __call__(self, request: httpx.Request) -> httpx.Response:
+        self.calls += 1
+        return httpx.Response(200, json=_PAGES[request.url.params.get("page_token")])
+
+
+@pytest.fixture(autouse=True)
+def _configured_service(monkeypatch):
+    monkeypatch.setattr(alpaca_data_module, "settings", Settings(alpaca_api_key="key", alpaca_api_secret="secret"))
+    clear_bars_cache()
+    yield
+    clear_bars_cache()
+
+
+def test_get_daily_bars_follows_pagination() -> None:
+    handler = _CountingHandler()
+    service = AlpacaDataService(transport=httpx.MockTransport(handler))
+
+    df = asyncio.run(service.get_daily_bars("aapl", date(2024, 1, 1), date(2024, 1, 31)))
+
+    assert handler.calls == 2
+    assert df["date"].tolist() == [date(2024, 1, 2), date(2024, 1, 3), date(2024, 1, 4)]
+    assert df["close"].tolist() == [185.5, 184.25, 181.9]
+
+
+def test_repeat_fetch_is_served_from_cache() -> None:
+    handler = _CountingHandler()
+    service = AlpacaDataService(transport=httpx.MockTransport(handler))
+
+    first = asyncio.run(service.get_daily_bars("AAPL", date(2024, 1, 1), date(2024, 1, 31)))
+    first.loc[0, "close"] = 0.0
+    second = asyncio.run(service.get_daily_bars("AAPL", date(2024, 1, 1), date(2024, 1, 31)))
+
+    assert handler.calls == 2
+    assert second["close"].tolist() == [185.5, 184.25, 181.9]
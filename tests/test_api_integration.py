@@ -1,6 +1,9 @@
 from datetime import date, timedelta
+import json
 
+import numpy as np
 import pandas as pd
+import pyarrow as pa
 from fastapi.testclient import TestClient
 
 import app.main as main_module
@@ -9,29 +12,29 @@ from app.services.alpaca_data import AlpacaDataError
 
 
 class _FakeDataServiceSuccess:
-    def get_weekly_bars(self, symbol: str, start: date, end: date) -> pd.DataFrame:
+    async def get_weekly_bars(self, symbol: str, start: date, end: date) -> pd.DataFrame:
         dates = [start + timedelta(days=7 * i) for i in range(30)]
         base = 100.0 if symbol == "SPY" else 120.0 if symbol == "QQQ" else 90.0 if symbol == "DIA" else 110.0
         prices = [base + i for i in range(30)]
         return pd.DataFrame({"date": dates, "close": prices})
 
-    def get_daily_bars(self, symbol: str, start: date, end: date) -> pd.DataFrame:
-        return self.get_weekly_bars(symbol, start, end)
+    async def get_daily_bars(self, symbol: str, start: date, end: date) -> pd.DataFrame:
+        return await self.get_weekly_bars(symbol, start, end)
 
 
 class _FakeDataServiceFailure:
-    def get_weekly_bars(self, symbol: str, start: date, end: date) -> pd.DataFrame:
+    async def get_weekly_bars(self, symbol: str, start: date, end: date) -> pd.DataFrame:
         raise AlpacaDataError(f"No weekly bar data returned for symbol '{symbol}'.")
 
-    def get_daily_bars(self, symbol: str, start: date, end: date) -> pd.DataFrame:
+    async def get_daily_bars(self, symbol: str, start: date, end: date) -> pd.DataFrame:
         raise AlpacaDataError(f"No daily bar data returned for symbol '{symbol}'.")
 
 
 class _FakeDataServiceUpstreamFailure:
-    def get_weekly_bars(self, symbol: str, start: date, end: date) -> pd.DataFrame:
+    async def get_weekly_bars(self, symbol: str, start: date, end: date) -> pd.DataFrame:
         raise AlpacaDataError(f"Alpaca data request failed for {symbol}: 429 rate limited")
 
-    def get_daily_bars(self, symbol: str, start: date, end: date) -> pd.DataFrame:
+    async def get_daily_bars(self, symbol: str, start: date, end: date) -> pd.DataFrame:
         raise AlpacaDataError(f"Alpaca data request failed for {symbol}: 429 rate limited")
 
 
@@ -40,20 +43,56 @@ class _FakeDataServiceDailyTracking(_FakeDataServiceSuccess):
         self.daily_calls = 0
         self.weekly_calls = 0
 
-    def get_weekly_bars(self, symbol: str, start: date, end: date) -> pd.DataFrame:
+    async def get_weekly_bars(self, symbol: str, start: date, end: date) -> pd.DataFrame:
         self.weekly_calls += 1
-        return super().get_weekly_bars(symbol, start, end)
+        return await super().get_weekly_bars(symbol, start, end)
 
-    def get_daily_bars(self, symbol: str, start: date, end: date) -> pd.DataFrame:
+    async def get_daily_bars(self, symbol: str, start: date, end: date) -> pd.DataFrame:
         self.daily_calls += 1
-        dates = [start + timedelta(days=i) for i in range(30)]
+        dates = [end - timedelta(days=29 - i) for i in range(30)]
         base = 100.0 if symbol == "SPY" else 120.0 if symbol == "QQQ" else 90.0 if symbol == "DIA" else 110.0
         prices = [base + i for i in range(30)]
         return pd.DataFrame({"date": dates, "close": prices})
 
 
+class _FakeDataServiceRecordingStarts(_FakeDataServiceSuccess):
+    def __init__(self) -> None:
+        self.starts: dict[str, date] = {}
+
+    async def get_weekly_bars(self, symbol: str, start: date, end: date) -> pd.DataFrame:
+        self.starts[symbol] = start
+        dates = [end - timedelta(days=7 * (99 - i)) for i in range(100)]
+        return pd.DataFrame({"date": dates, "close": [100.0 + i for i in range(100)]})
+
+
+class _FakeDataServiceStaleTicker(_FakeDataServiceRecordingStarts):
+    """AAPL bars stop at `last_bar`; benchmarks run through `end`."""
+
+    def __init__(self, last_bar: date) -> None:
+        super().__init__()
+        self.last_bar = last_bar
+        self.ticker_starts: list[date] = []
+
+    async def get_weekly_bars(self, symbol: str, start: date, end: date) -> pd.DataFrame:
+        if symbol != "AAPL":
+            return await super().get_weekly_bars(symbol, start, end)
+        self.ticker_starts.append(start)
+        dates = [start + timedelta(days=7 * i) for i in range((self.last_bar - start).days // 7 + 1)]
+        if not dates:
+            raise AlpacaDataError(f"No weekly bar data returned for symbol '{symbol}'.")
+        return pd.DataFrame({"date": dates, "close": [100.0 + i for i in range(len(dates))]})
+
+
+class _ClosableFakeDataService(_FakeDataServiceSuccess):
+    def __init__(self) -> None:
+        self.closed = False
+
+    async def close(self) -> None:
+        self.closed = True
+
+
 def test_backtest_endpoint_success(monkeypatch) -> None:
-    monkeypatch.setattr(main_module, "AlpacaDataService", lambda: _FakeDataServiceSuccess())
+    monkeypatch.setitem(app.dependency_overrides, main_module.get_data_service, lambda: _FakeDataServiceSuccess())
     client = TestClient(app)
 
     response = client.post(
@@ -70,7 +109,7 @@ def test_backtest_endpoint_success(monkeypatch) -> None:
 
 
 def test_backtest_endpoint_symbol_not_found(monkeypatch) -> None:
-    monkeypatch.setattr(main_module, "AlpacaDataService", lambda: _FakeDataServiceFailure())
+    monkeypatch.setitem(app.dependency_overrides, main_module.get_data_service, lambda: _FakeDataServiceFailure())
     client = TestClient(app)
 
     response = client.post(
@@ -83,7 +122,7 @@ def test_backtest_endpoint_symbol_not_found(monkeypatch) -> None:
 
 
 def test_backtest_endpoint_upstream_error(monkeypatch) -> None:
-    monkeypatch.setattr(main_module, "AlpacaDataService", lambda: _FakeDataServiceUpstreamFailure())
+    monkeypatch.setitem(app.dependency_overrides, main_module.get_data_service, lambda: _FakeDataServiceUpstreamFailure())
     client = TestClient(app)
 
     response = client.post(
@@ -95,8 +134,48 @@ def test_backtest_endpoint_upstream_error(monkeypatch) -> None:
     assert "rate limited" in response.json()["detail"]
 
 
+def test_backtest_endpoint_missing_credentials(monkeypatch) -> None:
+    def _raise_missing_credentials() -> None:
+        raise AlpacaDataError("Missing ALPACA_API_KEY or ALPACA_API_SECRET environment variables.")
+
+    monkeypatch.setattr(main_module, "AlpacaDataService", _raise_missing_credentials)
+    main_module._shared_data_service.cache_clear()
+    client = TestClient(app)
+
+    response = client.post(
+        "/backtest",
+        json={"ticker": "AAPL", "start_date": "2020-01-01", "end_date": "2024-01-01", "initial_capital": 10000},
+    )
+
+    assert response.status_code == 502
+    assert "ALPACA_API_KEY" in response.json()["detail"]
+
+
+def test_lifespan_shares_one_data_service_and_closes_it(monkeypatch) -> None:
+    created: list[_ClosableFakeDataService] = []
+
+    def _build_service() -> _ClosableFakeDataService:
+        created.append(_ClosableFakeDataService())
+        return created[-1]
+
+    monkeypatch.setattr(main_module, "AlpacaDataService", _build_service)
+    main_module._shared_data_service.cache_clear()
+
+    with TestClient(app) as client:
+        assert len(created) == 1
+        for _ in range(2):
+            response = client.post(
+                "/backtest",
+                json={"ticker": "AAPL", "start_date": "2020-01-01", "end_date": "2024-01-01", "initial_capital": 10000},
+            )
+            assert response.status_code == 200
+
+    assert len(created) == 1
+    assert created[0].closed
+
+
 def test_backtest_endpoint_applies_horizon_window_and_rebases(monkeypatch) -> None:
-    monkeypatch.setattr(main_module, "AlpacaDataService", lambda: _FakeDataServiceSuccess())
+    monkeypatch.setitem(app.dependency_overrides, main_module.get_data_service, lambda: _FakeDataServiceSuccess())
     client = TestClient(app)
 
     response = client.post(
@@ -121,8 +200,56 @@ def test_backtest_endpoint_applies_horizon_window_and_rebases(monkeypatch) -> No
     assert spy_curve[0]["equity"] == 10000
 
 
+def test_backtest_endpoint_fetches_only_history_needed_for_horizon(monkeypatch) -> None:
+    fake = _FakeDataServiceRecordingStarts()
+    monkeypatch.setitem(app.dependency_overrides, main_module.get_data_service, lambda: fake)
+    client = TestClient(app)
+
+    response = client.post(
+        "/backtest",
+        json={"ticker": "AAPL", "start_date": "2005-01-01", "end_date": "2024-01-01", "horizon": "1Y"},
+    )
+
+    assert response.status_code == 200
+    assert set(fake.starts) == {"AAPL", "SPY", "QQQ", "DIA"}
+    assert all(date(2021, 1, 1) < start < date(2023, 1, 1) for start in fake.starts.values())
+
+
+def test_backtest_endpoint_refetches_full_range_when_trimmed_range_is_empty(monkeypatch) -> None:
+    fake = _FakeDataServiceStaleTicker(last_bar=date(2015, 1, 1))
+    monkeypatch.setitem(app.dependency_overrides, main_module.get_data_service, lambda: fake)
+    client = TestClient(app)
+
+    response = client.post(
+        "/backtest",
+        json={"ticker": "AAPL", "start_date": "2005-01-01", "end_date": "2024-01-01", "horizon": "1Y"},
+    )
+
+    assert response.status_code == 200
+    assert len(fake.ticker_starts) == 2
+    assert fake.ticker_starts[0] > date(2015, 1, 1)
+    assert fake.ticker_starts[1] == date(2005, 1, 1)
+
+
+def test_backtest_endpoint_refetches_full_range_when_series_ends_early(monkeypatch) -> None:
+    end = date(2024, 1, 1)
+    fake = _FakeDataServiceStaleTicker(last_bar=end - main_module._HISTORY_SLACK - timedelta(days=7))
+    monkeypatch.setitem(app.dependency_overrides, main_module.get_data_service, lambda: fake)
+    client = TestClient(app)
+
+    response = client.post(
+        "/backtest",
+        json={"ticker": "AAPL", "start_date": "2005-01-01", "end_date": end.isoformat(), "horizon": "1Y"},
+    )
+
+    assert response.status_code == 200
+    assert len(fake.ticker_starts) == 2
+    assert fake.ticker_starts[0] > date(2021, 1, 1)
+    assert fake.ticker_starts[1] == date(2005, 1, 1)
+
+
 def test_backtest_endpoint_rejects_invalid_horizon(monkeypatch) -> None:
-    monkeypatch.setattr(main_module, "AlpacaDataService", lambda: _FakeDataServiceSuccess())
+    monkeypatch.setitem(app.dependency_overrides, main_module.get_data_service, lambda: _FakeDataServiceSuccess())
     client = TestClient(app)
 
     response = client.post(
@@ -141,7 +268,7 @@ def test_backtest_endpoint_rejects_invalid_horizon(monkeypatch) -> None:
 
 def test_backtest_endpoint_daily_timeframe_uses_daily_bars(monkeypatch) -> None:
     fake = _FakeDataServiceDailyTracking()
-    monkeypatch.setattr(main_module, "AlpacaDataService", lambda: fake)
+    monkeypatch.setitem(app.dependency_overrides, main_module.get_data_service, lambda: fake)
     client = TestClient(app)
 
     response = client.post(
@@ -161,7 +288,7 @@ def test_backtest_endpoint_daily_timeframe_uses_daily_bars(monkeypatch) -> None:
 
 
 def test_backtest_endpoint_accepts_long_short_mode(monkeypatch) -> None:
-    monkeypatch.setattr(main_module, "AlpacaDataService", lambda: _FakeDataServiceSuccess())
+    monkeypatch.setitem(app.dependency_overrides, main_module.get_data_service, lambda: _FakeDataServiceSuccess())
     client = TestClient(app)
 
     response = client.post(
@@ -179,7 +306,7 @@ def test_backtest_endpoint_accepts_long_short_mode(monkeypatch) -> None:
 
 
 def test_backtest_endpoint_accepts_mean_reversion_strategy(monkeypatch) -> None:
-    monkeypatch.setattr(main_module, "AlpacaDataService", lambda: _FakeDataServiceSuccess())
+    monkeypatch.setitem(app.dependency_overrides, main_module.get_data_service, lambda: _FakeDataServiceSuccess())
     client = TestClient(app)
 
     response = client.post(
@@ -200,28 +327,31 @@ def test_backtest_endpoint_accepts_mean_reversion_strategy(monkeypatch) -> None:
 
 
 def test_backtest_endpoint_rejects_mean_reversion_invalid_thresholds(monkeypatch) -> None:
-    monkeypatch.setattr(main_module, "AlpacaDataService", lambda: _FakeDataServiceSuccess())
+    fake = _FakeDataServiceRecordingStarts()
+    monkeypatch.setitem(app.dependency_overrides, main_module.get_data_service, lambda: fake)
     client = TestClient(app)
 
-    response = client.post(
-        "/backtest",
-        json={
-            "ticker": "AAPL",
-            "start_date": "2020-01-01",
-            "end_date": "2024-01-01",
-            "initial_capital": 10000,
-            "strategy_type": "mean_reversion_zscore",
-            "mr_entry_z": 1.0,
-            "mr_exit_z": 1.0,
-        },
-    )
-
-    assert response.status_code == 400
-    assert "mr_exit_z must be smaller than mr_entry_z" in response.json()["detail"]
+    for path in ("/backtest", "/backtest/arrow"):
+        response = client.post(
+            path,
+            json={
+                "ticker": "AAPL",
+                "start_date": "2020-01-01",
+                "end_date": "2024-01-01",
+                "initial_capital": 10000,
+                "strategy_type": "mean_reversion_zscore",
+                "mr_entry_z": 1.0,
+                "mr_exit_z": 1.0,
+            },
+        )
+
+        assert response.status_code == 400
+        assert "mr_exit_z must be smaller than mr_entry_z" in response.json()["detail"]
+    assert fake.starts == {}
 
 
 def test_portfolio_backtest_endpoint_success(monkeypatch) -> None:
-    monkeypatch.setattr(main_module, "AlpacaDataService", lambda: _FakeDataServiceSuccess())
+    monkeypatch.setitem(app.dependency_overrides, main_module.get_data_service, lambda: _FakeDataServiceSuccess())
     client = TestClient(app)
 
     response = client.post(
@@ -246,7 +376,7 @@ def test_portfolio_backtest_endpoint_success(monkeypatch) -> None:
 
 
 def test_portfolio_backtest_ranking_limits_positions(monkeypatch) -> None:
-    monkeypatch.setattr(main_module, "AlpacaDataService", lambda: _FakeDataServiceSuccess())
+    monkeypatch.setitem(app.dependency_overrides, main_module.get_data_service, lambda: _FakeDataServiceSuccess())
     client = TestClient(app)
 
     response = client.post(
@@ -269,7 +399,7 @@ def test_portfolio_backtest_ranking_limits_positions(monkeypatch) -> None:
 
 
 def test_portfolio_backtest_rejects_empty_tickers(monkeypatch) -> None:
-    monkeypatch.setattr(main_module, "AlpacaDataService", lambda: _FakeDataServiceSuccess())
+    monkeypatch.setitem(app.dependency_overrides, main_module.get_data_service, lambda: _FakeDataServiceSuccess())
     client = TestClient(app)
 
     response = client.post(
@@ -284,3 +414,37 @@ def test_portfolio_backtest_rejects_empty_tickers(monkeypatch) -> None:
     )
 
     assert response.status_code == 422
+
+
+def test_backtest_arrow_endpoint_streams_equity_curves(monkeypatch) -> None:
+    monkeypatch.setitem(app.dependency_overrides, main_module.get_data_service, lambda: _FakeDataServiceSuccess())
+    client = TestClient(app)
+
+    response = client.post(
+        "/backtest/arrow",
+        json={"ticker": "AAPL", "start_date": "2020-01-01", "end_date": "2024-01-01", "initial_capital": 10000},
+    )
+
+    assert response.status_code == 200
+    assert response.headers["content-type"] == "application/vnd.apache.arrow.stream"
+    reader = pa.ipc.open_stream(response.content)
+    table = reader.read_all()
+    metrics = json.loads(reader.schema.metadata[b"metrics"])
+
+    assert table.column_names == ["series", "symbol", "date", "equity"]
+    assert table.num_rows == 5 * 30
+    assert [item["series"] for item in metrics] == ["strategy", "buy_and_hold", "benchmark", "benchmark", "benchmark"]
+    assert {item["symbol"] for item in metrics} == {"AAPL", "SPY", "QQQ", "DIA"}
+
+
+def test_portfolio_weights_rank_active_tickers_by_momentum() -> None:
+    active = np.array([[True, True, True], [True, True, True], [True, False, False], [False, False, False]])
+    momentum = np.array([[np.nan, 0.1, 0.1], [0.2, 0.2, 0.3], [0.1, 0.5, 0.9], [0.4, 0.5, 0.6]])
+
+    ranked = main_module._portfolio_weights(active, momentum, top_n=2)
+    unranked = main_module._portfolio_weights(active, momentum, top_n=None)
+
+    # Row 0: missing momentum ranks last. Row 1: equal momentum keeps ticker order.
+    # Row 2: top_n exceeds the active count. Row 3: nothing active stays in cash.
+    np.testing.assert_allclose(ranked, [[0.0, 0.5, 0.5], [0.5, 0.0, 0.5], [1.0, 0.0, 0.0], [0.0, 0.0, 0.0]])
+    np.testing.assert_allclose(unranked, [[1 / 3] * 3, [1 / 3] * 3, [1.0, 0.0, 0.0], [0.0, 0.0, 0.0]])
@@ -1,4 +1,6 @@
+import numpy as np
 import pandas as pd
+import pytest
 
 from app.services.metrics import compute_metrics
 
@@ -11,3 +13,11 @@ def test_metrics_with_flat_returns() -> None:
     assert metrics["max_drawdown"] == 0.0
     assert metrics["volatility"] == 0.0
     assert metrics["sharpe_ratio"] == 0.0
+
+
+def test_metrics_treat_missing_returns_as_flat() -> None:
+    metrics = compute_metrics(np.array([np.nan, 0.1, -0.5, 0.2]))
+
+    assert metrics["cumulative_return"] == pytest.approx(-0.34)
+    assert metrics["max_drawdown"] == pytest.approx(-0.5)
+    assert metrics["volatility"] == pytest.approx(np.std([0.0, 0.1, -0.5, 0.2]) * np.sqrt(52))
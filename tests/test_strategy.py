@@ -1,8 +1,9 @@
 from datetime import date, timedelta
 
+import numpy as np
 import pandas as pd
 
-from app.services.strategy import run_mean_reversion_zscore, run_sma_crossover
+from app.services.strategy import equity_from_returns, run_mean_reversion_zscore, run_sma_crossover
 
 
 def test_sma_strategy_produces_required_columns() -> None:
@@ -93,3 +94,35 @@ def test_mean_reversion_can_short_and_respect_max_holding() -> None:
     assert (with_short["position"] < 0).sum() > 0
     assert (long_only["position"] < 0).sum() == 0
     assert with_short["position"].abs().max() <= 1.0
+
+
+def test_equity_from_returns_compounds_each_row() -> None:
+    returns = np.array([[0.0, 0.1, -0.5], [0.0, 0.0, 0.2]])
+
+    equity = equity_from_returns(returns, initial_capital=100.0)
+
+    np.testing.assert_allclose(equity, [[100.0, 110.0, 55.0], [100.0, 100.0, 120.0]])
+
+
+def test_mean_reversion_rolling_stats_match_pandas() -> None:
+    closes = [101.37] * 25 + [101.37 + 0.5 * i for i in range(1, 40)]
+    df = pd.DataFrame({"date": [date(2020, 1, 3) + timedelta(weeks=i) for i in range(len(closes))], "close": closes})
+
+    out = run_mean_reversion_zscore(df, initial_capital=10_000, lookback=20)
+
+    expected_std = df["close"].rolling(window=20, min_periods=20).std()
+    np.testing.assert_allclose(out["mean"], df["close"].rolling(window=20, min_periods=20).mean(), rtol=1e-12)
+    np.testing.assert_allclose(out["std"], expected_std.where(expected_std != 0.0), rtol=1e-12)
+
+
+def test_sma_crossover_exact_tie_takes_the_short_side() -> None:
+    # The last bar's SMA(5) and SMA(20) are both exactly 0.994 in cents.
+    closes = [1.0, 0.98, 1.03, 1.01, 0.98, 0.97, 1.0, 1.01, 1.01, 1.01, 1.0, 0.99, 0.97, 0.98, 0.97, 1.02, 1.01, 0.98]
+    closes += [0.98, 0.98]
+    df = pd.DataFrame({"date": [date(2020, 1, 3) + timedelta(weeks=i) for i in range(len(closes))], "close": closes})
+
+    long_only = run_sma_crossover(df, initial_capital=10_000, position_mode="long_only")
+    long_short = run_sma_crossover(df, initial_capital=10_000, position_mode="long_short")
+
+    assert long_only["signal"].iloc[-1] == 0.0
+    assert long_short["signal"].iloc[-1] == -1.0